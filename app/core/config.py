@@ -9,6 +9,7 @@ class Settings(BaseSettings):
     OPENAI_MODEL_NAME: str = "gpt-4o"
     GEMINI_MODEL_NAME: str = "gemini-2.5-flash"
     DEEPSEEK_MODEL_NAME: str = "deepseek-chat"
+    LLM_REPAIR_ATTEMPTS: int = 1
     
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Literal, Dict
+from pydantic import BaseModel, Field, ConfigDict, WithJsonSchema, field_validator
+from typing import List, Optional, Literal, Dict, Annotated
 
 class BasePortfolioModel(BaseModel):
     """Base config to handle CamelCase JSON <-> snake_case Python"""
@@ -106,13 +106,44 @@ class StudentPortfolioInput(BasePortfolioModel):
     
     drive_data: Optional[List[DriveData]] = Field(default=[], alias="DriveData")
 
+SKILL_GROUPS_SCHEMA = {
+    "type": "array",
+    "description": "Detected skills grouped into meaningful categories (e.g. Technical, Tools, Soft Skills).",
+    "items": {
+        "type": "object",
+        "properties": {
+            "category": {"type": "string"},
+            "skills": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["category", "skills"],
+    },
+}
+
 class AIContentOutput(BaseModel):
-    career_objective: str
-    portfolio_summary: str
-    course_outcomes_sentence: str
-    skills_grouped: Dict[str, List[str]]
-    achievements_activities_formatted: List[str]
-    rating: int
+    """LLM generated report content."""
+    career_objective: str = Field(..., description="3-4 lines, crisp and personalized, tailored to the Target Job/Drive if provided.")
+    portfolio_summary: str = Field(..., description="5-7 lines summarizing academics, projects, internships, abilities and activities.")
+    course_outcomes_sentence: str = Field(..., description="A single sentence starting with 'Demonstrated proficiency in...' listing the outcomes.")
+    # Providers cannot emit free-form object keys under a schema, so skills travel as a list of groups.
+    skills_grouped: Annotated[Dict[str, List[str]], WithJsonSchema(SKILL_GROUPS_SCHEMA)]
+    achievements_activities_formatted: List[str] = Field(..., description="Impressive bullet points from Achievements and Activities.")
+    rating: int = Field(..., ge=1, le=5, description="Suitability score (1-5) for the Target Job/Drive.")
+
+    @field_validator("skills_grouped", mode="before")
+    @classmethod
+    def group_skills(cls, value):
+        if not isinstance(value, list):
+            return value
+
+        grouped = {}
+        for group in value:
+            if not isinstance(group, dict) or not isinstance(group.get("category"), str):
+                raise ValueError("each skill group needs a string 'category'")
+            skills = group.get("skills")
+            if not isinstance(skills, list):
+                raise ValueError("each skill group needs a 'skills' list")
+            grouped.setdefault(group["category"], []).extend(skills)
+        return grouped
 
 class ReportURLResponse(BaseModel):
     filename: str
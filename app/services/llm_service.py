@@ -1,8 +1,10 @@
 import json
-from collections import defaultdict
+from collections import defaultdict, Counter
+from typing import Optional, Set
 from openai import AsyncOpenAI
 import google.generativeai as genai
 from fastapi import HTTPException
+from pydantic import ValidationError
 
 from app.core.config import settings
 from app.models.report import StudentPortfolioInput, AIContentOutput
@@ -86,9 +88,9 @@ def get_portfolio_prompt(data: StudentPortfolioInput) -> str:
       "career_objective": "string (3-4 lines, crisp and personalized. If a Target Job is listed, tailor this specifically to that role/company.)",
       "portfolio_summary": "string (5-7 lines, holistic. Summarize academics, projects, internships, abilities, and activities.)",
       "course_outcomes_sentence": "string (A single sentence starting with 'Demonstrated proficiency in...', listing the outcomes. Ensure the last item is preceded by 'and'.)",
-      "skills_grouped": {
-          "<CategoryName>": ["skill1", "skill2", "..."]
-      },
+      "skills_grouped": [
+          {"category": "<CategoryName>", "skills": ["skill1", "skill2", "..."]}
+      ],
       "achievements_activities_formatted": [
           "string"
       ] (Generate impressive bullet points from Achievements and Activities),
@@ -142,6 +144,126 @@ def get_portfolio_prompt(data: StudentPortfolioInput) -> str:
     """
     return prompt
 
+def get_repair_prompt(prompt: str, fields: Set[str]) -> str:
+    return f"""
+    {prompt}
+
+    **Correction Required:**
+    A previous answer was missing or had invalid values for: {', '.join(sorted(fields))}.
+    Return a JSON object containing ONLY these fields, following the instructions above.
+    """
+
+_OPENAI_SCHEMA_KEYS = {"type", "description", "properties", "required", "items", "enum", "minimum", "maximum"}
+_GEMINI_SCHEMA_KEYS = {"type", "description", "properties", "required", "items", "enum", "format", "nullable"}
+
+class LLMOutputError(ValueError):
+    """Raised when the model output still fails validation after all repair attempts."""
+
+def _provider_schema(schema: dict, model_name: str) -> dict:
+    """Reduces a pydantic JSON schema to the subset each provider accepts."""
+    allowed = _GEMINI_SCHEMA_KEYS if model_name == "gemini" else _OPENAI_SCHEMA_KEYS
+    result = {}
+    for key, value in schema.items():
+        if key not in allowed:
+            continue
+        if key == "properties":
+            value = {name: _provider_schema(prop, model_name) for name, prop in value.items()}
+        elif key == "items":
+            value = _provider_schema(value, model_name)
+        elif key == "type" and model_name == "gemini":
+            value = value.upper()
+        result[key] = value
+
+    if model_name == "openai" and result.get("type") == "object":
+        # Strict mode requires every property to be listed and no extra keys.
+        result["required"] = list(result.get("properties", {}))
+        result["additionalProperties"] = False
+    return result
+
+def _build_response_schema(model_name: str) -> dict:
+    schema = _provider_schema(AIContentOutput.model_json_schema(), model_name)
+    # The root description is the class docstring, which is not an instruction for the model.
+    schema.pop("description", None)
+    return schema
+
+RESPONSE_SCHEMAS = {name: _build_response_schema(name) for name in ("openai", "gemini")}
+
+def get_response_schema(model_name: str, fields: Optional[Set[str]] = None) -> dict:
+    schema = dict(RESPONSE_SCHEMAS[model_name])
+    if fields:
+        schema["properties"] = {k: v for k, v in schema["properties"].items() if k in fields}
+        schema["required"] = [k for k in schema["required"] if k in fields]
+    return schema
+
+# Per-model counters of structured output outcomes since process start.
+llm_output_stats = defaultdict(Counter)
+
+def _record_outcome(model_name: str, outcome: str) -> None:
+    stats = llm_output_stats[model_name]
+    stats["requests"] += 1
+    stats[outcome] += 1
+    app_logger.info(
+        f"LLM output stats for {model_name}: requests={stats['requests']} "
+        f"repair_rate={stats['repaired'] / stats['requests']:.1%} "
+        f"invalid_output_rate={stats['invalid_output'] / stats['requests']:.1%} "
+        f"request_error_rate={stats['request_error'] / stats['requests']:.1%} "
+        f"repair_calls={stats['repair_calls']}"
+    )
+
+async def _request_completion(model_name: str, prompt: str, fields: Optional[Set[str]] = None) -> str:
+    if model_name == "gemini":
+        if not settings.GEMINI_API_KEY:
+             raise ValueError("GEMINI_API_KEY not found")
+        response = await gemini_model.generate_content_async(
+            prompt,
+            generation_config={
+                "response_mime_type": "application/json",
+                "response_schema": get_response_schema(model_name, fields),
+            },
+        )
+        return response.text
+    elif model_name == "openai":
+         response = await openai_client.chat.completions.create(
+            model=settings.OPENAI_MODEL_NAME,
+            messages=[{"role": "user", "content": prompt}],
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "ai_content_output",
+                    "schema": get_response_schema(model_name, fields),
+                    "strict": True,
+                },
+            },
+        )
+         return response.choices[0].message.content
+    elif model_name == "deepseek":
+         # DeepSeek only supports JSON mode; the schema is described in the prompt.
+         response = await deepseek_client.chat.completions.create(
+            model=settings.DEEPSEEK_MODEL_NAME,
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"}
+        )
+         return response.choices[0].message.content
+    raise ValueError(f"Unsupported model: {model_name}")
+
+def _parse_content(response_content: str) -> dict:
+    try:
+        data = json.loads(response_content or "")
+    except json.JSONDecodeError as e:
+        error_logger.warning(f"LLM returned malformed JSON: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def _invalid_fields(data: dict) -> Set[str]:
+    try:
+        AIContentOutput(**data)
+        return set()
+    except ValidationError as e:
+        return {str(err["loc"][0]) for err in e.errors() if err["loc"]} or set(AIContentOutput.model_fields)
+    except Exception as e:
+        error_logger.warning(f"Unexpected error validating LLM output: {e}")
+        return set(AIContentOutput.model_fields)
+
 async def generate_ai_content(student_data: StudentPortfolioInput) -> AIContentOutput:
     prompt = get_portfolio_prompt(student_data)
     model_name = student_data.model
@@ -149,29 +271,29 @@ async def generate_ai_content(student_data: StudentPortfolioInput) -> AIContentO
     app_logger.info(f"Generating AI content for {student_data.student_name} using {model_name}")
 
     try:
-        response_content = ""
-        if model_name == "gemini":
-            if not settings.GEMINI_API_KEY:
-                 raise ValueError("GEMINI_API_KEY not found")
-            response = await gemini_model.generate_content_async(prompt, generation_config={"response_mime_type": "application/json"})
-            response_content = response.text.strip().removeprefix("```json").removesuffix("```")
-        elif model_name == "openai":
-             response = await openai_client.chat.completions.create(
-                model=settings.OPENAI_MODEL_NAME, 
-                messages=[{"role": "user", "content": prompt}], 
-                response_format={"type": "json_object"}
-            )
-             response_content = response.choices[0].message.content
-        elif model_name == "deepseek":
-             response = await deepseek_client.chat.completions.create(
-                model=settings.DEEPSEEK_MODEL_NAME, 
-                messages=[{"role": "user", "content": prompt}], 
-                response_format={"type": "json_object"}
+        data = _parse_content(await _request_completion(model_name, prompt))
+        invalid = _invalid_fields(data)
+        attempts = 0
+
+        while invalid and attempts < settings.LLM_REPAIR_ATTEMPTS:
+            attempts += 1
+            llm_output_stats[model_name]["repair_calls"] += 1
+            app_logger.info(f"Repairing fields {sorted(invalid)} for {student_data.student_name} (attempt {attempts})")
+
+            valid = {k: v for k, v in data.items() if k not in invalid}
+            repaired = _parse_content(
+                await _request_completion(model_name, get_repair_prompt(prompt, invalid), invalid)
             )
-             response_content = response.choices[0].message.content
-        
-        return AIContentOutput(**json.loads(response_content))
+            data = {**valid, **{k: v for k, v in repaired.items() if k in invalid}}
+            invalid = _invalid_fields(data)
+
+        if invalid:
+            raise LLMOutputError(f"Invalid or missing fields after {attempts} repair attempt(s): {sorted(invalid)}")
+
+        _record_outcome(model_name, "repaired" if attempts else "succeeded")
+        return AIContentOutput(**data)
     except Exception as e:
+        _record_outcome(model_name, "invalid_output" if isinstance(e, LLMOutputError) else "request_error")
         error_logger.error(f"AI Generation failed: {e}")
         
         raise HTTPException(
@@ -0,0 +1,137 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.models.report import AIContentOutput, StudentPortfolioInput
+from app.services import llm_service
+
+VALID_OUTPUT = {
+    "career_objective": "Objective",
+    "portfolio_summary": "Summary",
+    "course_outcomes_sentence": "Demonstrated proficiency in A and B.",
+    "skills_grouped": [{"category": "Technical", "skills": ["Python"]}],
+    "achievements_activities_formatted": ["Won a hackathon"],
+    "rating": 4,
+}
+
+def make_student(model="openai"):
+    return StudentPortfolioInput(
+        model=model,
+        StudentName="Test Student",
+        CourseName="BSc",
+        InstitutionName="College",
+        Email="test@example.com",
+        Batch="2024",
+    )
+
+@pytest.fixture
+def completions(monkeypatch):
+    """Replaces the provider call with queued responses and records each call."""
+    calls = []
+    responses = []
+
+    async def fake_request(model_name, prompt, fields=None):
+        calls.append(fields)
+        return json.dumps(responses.pop(0))
+
+    monkeypatch.setattr(llm_service, "_request_completion", fake_request)
+    llm_service.llm_output_stats.clear()
+    return calls, responses
+
+
+def test_first_pass_success(completions):
+    calls, responses = completions
+    responses.append(VALID_OUTPUT)
+
+    result = asyncio.run(llm_service.generate_ai_content(make_student()))
+
+    assert result.skills_grouped == {"Technical": ["Python"]}
+    assert calls == [None]
+    assert llm_service.llm_output_stats["openai"]["succeeded"] == 1
+
+
+def test_missing_field_is_repaired(completions):
+    calls, responses = completions
+    first = {k: v for k, v in VALID_OUTPUT.items() if k != "portfolio_summary"}
+    responses.extend([{**first, "rating": 9}, {"portfolio_summary": "Repaired", "rating": 5, "career_objective": "ignored"}])
+
+    result = asyncio.run(llm_service.generate_ai_content(make_student()))
+
+    assert calls == [None, {"portfolio_summary", "rating"}]
+    assert result.portfolio_summary == "Repaired"
+    assert result.rating == 5
+    assert result.career_objective == "Objective"
+    assert llm_service.llm_output_stats["openai"]["repaired"] == 1
+
+
+def test_repair_exhausted_returns_500(completions, monkeypatch):
+    calls, responses = completions
+    monkeypatch.setattr(settings, "LLM_REPAIR_ATTEMPTS", 1)
+    responses.extend([{"career_objective": "Objective"}, {}])
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(llm_service.generate_ai_content(make_student()))
+
+    assert exc.value.status_code == 500
+    assert len(calls) == 2
+    assert llm_service.llm_output_stats["openai"]["invalid_output"] == 1
+    assert llm_service.llm_output_stats["openai"]["request_error"] == 0
+
+
+def test_request_error_is_not_counted_as_invalid_output(monkeypatch):
+    async def failing_request(model_name, prompt, fields=None):
+        raise ConnectionError("network down")
+
+    monkeypatch.setattr(llm_service, "_request_completion", failing_request)
+    llm_service.llm_output_stats.clear()
+
+    with pytest.raises(HTTPException):
+        asyncio.run(llm_service.generate_ai_content(make_student()))
+
+    assert llm_service.llm_output_stats["openai"]["request_error"] == 1
+    assert llm_service.llm_output_stats["openai"]["invalid_output"] == 0
+
+
+def test_skill_groups_with_same_category_are_merged():
+    data = {**VALID_OUTPUT, "skills_grouped": [{"category": "T", "skills": ["x"]}, {"category": "T", "skills": ["y"]}]}
+
+    assert AIContentOutput(**data).skills_grouped == {"T": ["x", "y"]}
+
+
+def test_malformed_skill_group_is_reported_as_invalid_field():
+    data = {**VALID_OUTPUT, "skills_grouped": [{"category": ["T"], "skills": ["x"]}]}
+
+    assert llm_service._invalid_fields(data) == {"skills_grouped"}
+
+
+def test_openai_schema_is_strict():
+    schema = llm_service.get_response_schema("openai")
+
+    assert "description" not in schema
+    assert schema["additionalProperties"] is False
+    assert set(schema["required"]) == set(AIContentOutput.model_fields)
+    group = schema["properties"]["skills_grouped"]["items"]
+    assert group["additionalProperties"] is False
+    assert schema["properties"]["rating"]["minimum"] == 1
+    assert schema["properties"]["rating"]["maximum"] == 5
+
+
+def test_gemini_schema_uses_supported_keys():
+    schema = llm_service.get_response_schema("gemini")
+
+    assert schema["type"] == "OBJECT"
+    assert schema["properties"]["skills_grouped"]["items"]["type"] == "OBJECT"
+    assert "additionalProperties" not in schema
+    assert "title" not in schema["properties"]["rating"]
+    assert "minimum" not in schema["properties"]["rating"]
+
+
+def test_partial_schema_only_requests_invalid_fields():
+    schema = llm_service.get_response_schema("openai", {"rating"})
+
+    assert list(schema["properties"]) == ["rating"]
+    assert schema["required"] == ["rating"]
+    assert len(llm_service.RESPONSE_SCHEMAS["openai"]["properties"]) == len(AIContentOutput.model_fields)